@@ -9,7 +9,7 @@
 # Last mod  : 2021-05-04
 # -----------------------------------------------------------------------------
 
-import sys, smtplib, json, time, socket, string, collections
+import os, sys, json, time, queue, socket, string, collections, atexit, threading, weakref
 from typing import Union
 
 # TODO: Add info
@@ -59,6 +59,8 @@ The reporter module offers three main ways of reporting errors:
    if you want to process it to somewhere else).
  - 'SMTPReporter' which will send an email as soon as the error happens
  - 'XMPPReporter' which will send an instant message as soon as the error happens.
+ - 'AsyncReporter' which forwards the errors to its own delegates from a
+   background thread.
 
 The main functions you'll use in this module are the following:
 
@@ -85,6 +87,29 @@ ERROR     = 5
 EXCEPTION = 6
 FATAL     = 7
 DEFAULT_LEVEL = 2
+LEVELS    = {
+	"DEBUG"     : DEBUG,
+	"TRACE"     : TRACE,
+	"INFO"      : INFO,
+	"SUCCESS"   : SUCCESS,
+	"WARN"      : WARNING,
+	"WARNING"   : WARNING,
+	"ERROR"     : ERROR,
+	"EXCEPTION" : EXCEPTION,
+	"FATAL"     : FATAL,
+}
+
+# Levels below MAX_LEVEL are stripped at import time (see the end of the
+# module), it is set through the `REPORTER_MAX_LEVEL` environment variable,
+# either as a level name or number. Invalid values are reported and ignored.
+MAX_LEVEL = (os.environ.get("REPORTER_MAX_LEVEL") or "DEBUG").strip()
+if MAX_LEVEL.isdigit():
+	MAX_LEVEL = int(MAX_LEVEL)
+elif MAX_LEVEL.upper() in LEVELS:
+	MAX_LEVEL = LEVELS[MAX_LEVEL.upper()]
+else:
+	sys.stderr.write("[!] reporter: Unsupported REPORTER_MAX_LEVEL=%r, expected one of %s or a number\n" % (MAX_LEVEL, ", ".join(LEVELS)))
+	MAX_LEVEL = DEBUG
 
 COLOR_NONE         = -1
 COLOR_BLACK        = 1
@@ -103,6 +128,28 @@ COLOR_CYAN_BOLD    = 16
 COLOR_LIGHT_GRAY   = 17
 COLOR_DARK_GRAY    = 18
 
+# SEE: http://tldp.org/HOWTO/Bash-Prompt-HOWTO/x329.html
+_ESC   = "\x1b["
+_RESET = sys.intern(_ESC + "0m")
+_ANSI  = dict((k, sys.intern(v)) for k, v in {
+	COLOR_NONE         : "",
+	COLOR_LIGHT_GRAY   : _RESET + _ESC + "00;37m",
+	COLOR_DARK_GRAY    : _RESET + _ESC + "01;30m",
+	COLOR_BLACK        : _RESET + _ESC + "00;30m",
+	COLOR_BLACK_BOLD   : _RESET + _ESC + "01;30m",
+	COLOR_RED          : _RESET + _ESC + "00;31m",
+	COLOR_RED_BOLD     : _RESET + _ESC + "01;31m",
+	COLOR_GREEN        : _RESET + _ESC + "00;32m",
+	COLOR_GREEN_BOLD   : _RESET + _ESC + "01;32m",
+	COLOR_BLUE         : _RESET + _ESC + "00;34m",
+	COLOR_BLUE_BOLD    : _RESET + _ESC + "01;34m",
+	COLOR_MAGENTA      : _RESET + _ESC + "00;35m",
+	COLOR_MAGENTA_BOLD : _RESET + _ESC + "01;35m",
+	COLOR_CYAN         : _RESET + _ESC + "00;36m",
+	COLOR_CYAN_BOLD    : _RESET + _ESC + "01;36m",
+	COLOR_YELLOW       : _RESET + _ESC + "00;33m",
+}.items())
+
 TEMPLATE_COMPACT = [
 	u"{3}",
 	u"{3}",
@@ -135,9 +182,89 @@ TEMPLATE_DEFAULT = [
 	u"!!! {0}│{2}│{3}"
 ]
 
+# The formatted timestamp only changes once per second, so we keep the last
+# `(second, string)` pair around.
+_TS_CACHE = [0, ""]
+
+# Reporters holding pending messages, which are closed at exit. The set is
+# weak so that registering doesn't keep the reporters alive.
+_CLOSE_AT_EXIT = weakref.WeakSet()
+
+def _closeAtExit():
+	# NOTE: Async reporters go first, as they feed the other ones
+	for reporter in sorted(_CLOSE_AT_EXIT, key=lambda _: not isinstance(_, AsyncReporter)):
+		try:
+			reporter.close()
+		except Exception as e:
+			sys.stderr.write("[!] %s failed to close: %s\n" % (reporter.__class__.__name__, e))
+
+atexit.register(_closeAtExit)
+
 def ensure_unicode( text:Union[str,bytes] ) -> str:
 	return str(text, "utf8") if isinstance(text,bytes) else text
 
+def _compileTemplate( template ):
+	"""Returns a function that takes `(timestamp, code, component, message)`
+	and renders the given template. Templates made of plain positional fields
+	are parsed once and rendered by joining their parts, other templates (or
+	non-string values) fall back to `str.format`."""
+	head    = ""
+	fields  = []
+	literal = ""
+	try:
+		parsed = list(string.Formatter().parse(template))
+	except ValueError:
+		return template.format
+	for text, field, spec, conversion in parsed:
+		literal += text
+		if field is None:
+			continue
+		elif spec or conversion or field not in ("0", "1", "2", "3"):
+			return template.format
+		elif fields:
+			fields[-1] = (fields[-1][0], literal)
+		else:
+			head = literal
+		fields.append((int(field), ""))
+		literal = ""
+	if fields:
+		fields[-1] = (fields[-1][0], literal)
+	# NOTE: The renderers are unrolled by number of fields, as a generic
+	# loop would be slower than `str.format` itself.
+	if len(fields) == 1:
+		# NOTE: This is the case of the compact and command templates,
+		# which only show the message.
+		(a, la), = fields
+		def render( *values ):
+			try:
+				return head + values[a] + la
+			except TypeError:
+				return template.format(*values)
+	elif len(fields) == 2:
+		(a, la), (b, lb) = fields
+		def render( *values ):
+			try:
+				return "".join((head, values[a], la, values[b], lb))
+			except TypeError:
+				return template.format(*values)
+	elif len(fields) == 3:
+		(a, la), (b, lb), (c, lc) = fields
+		def render( *values ):
+			try:
+				return "".join((head, values[a], la, values[b], lb, values[c], lc))
+			except TypeError:
+				return template.format(*values)
+	elif len(fields) == 4:
+		(a, la), (b, lb), (c, lc), (d, ld) = fields
+		def render( *values ):
+			try:
+				return "".join((head, values[a], la, values[b], lb, values[c], lc, values[d], ld))
+			except TypeError:
+				return template.format(*values)
+	else:
+		render = template.format
+	return render
+
 # ------------------------------------------------------------------------------
 #
 # REPORTER
@@ -147,7 +274,10 @@ def ensure_unicode( text:Union[str,bytes] ) -> str:
 # FIXME: Should aggregate message when there's no delegate
 class Reporter:
 	"""Abstract class that defines the main (abstract) methods for an error
-	reporter."""
+	reporter.
+
+	The `delegates` list is read-only: use `register` and `unregister` to
+	change it, as the reporter derives its dispatch state from them."""
 
 	TEMPLATE = TEMPLATE_DEFAULT
 	INSTANCE = None
@@ -165,62 +295,101 @@ class Reporter:
 		return
 
 	def __init__( self, level=None, template=None ):
-		self.delegates = []
+		self.delegates        = []
+		self._delegatesById   = {}
+		self._delegateClasses = {}
+		self._templates       = None
+		self._formatters      = None
 		if template:
 			self.TEMPLATE = template
+		self._updateDispatch()
 		self.setLevel(level if level is not None else DEFAULT_LEVEL)
 
+	@property
+	def level( self ):
+		return self._level
+
+	@level.setter
+	def level( self, level ):
+		# NOTE: We precompute which levels are active so that the level
+		# methods can bail out with a single lookup, before any formatting.
+		self._level  = level
+		self._active = tuple(_ >= level for _ in range(FATAL + 1))
+
 	def setLevel( self, level ):
 		self.level = level
 		for _ in self.delegates:_.setLevel(level)
 		return self
 
 	def has( self, reporterClass ):
-		for _ in self.delegates:
-			if _.__class__ is reporterClass:
-				return True
-		return False
+		return reporterClass in self._delegateClasses
 
 	def register( self, *reporters ):
 		for reporter in reporters:
-			if reporter not in self.delegates:
-				reporter.level = self.level
+			if id(reporter) not in self._delegatesById:
+				reporter.setLevel(self.level)
 				self.delegates.append(reporter)
+				self._delegatesById[id(reporter)] = reporter
+				self._delegateClasses[reporter.__class__] = self._delegateClasses.get(reporter.__class__, 0) + 1
+		self._updateDispatch()
 
 	def unregister( self, *reporters ):
-		for reporter in reporters:
-			assert (reporter in self.delegates), "Reporter not registered as a delegate"
-			self.delegates.remove(reporter)
+		try:
+			for reporter in reporters:
+				if id(reporter) not in self._delegatesById:
+					raise ValueError("Reporter not registered as a delegate: %s" % (reporter,))
+				del self._delegatesById[id(reporter)]
+				# NOTE: We keep a count per class, as several delegates may
+				# share the same class.
+				count = self._delegateClasses[reporter.__class__] - 1
+				if count:
+					self._delegateClasses[reporter.__class__] = count
+				else:
+					del self._delegateClasses[reporter.__class__]
+		finally:
+			# NOTE: The delegates are rebuilt once for all the given
+			# reporters, dicts preserve the registration order.
+			self.delegates[:] = self._delegatesById.values()
+			self._updateDispatch()
 
 	def timestamp( self ):
-		return time.strftime("%Y-%m-%dT%H:%M:%S")
+		t = int(time.time())
+		c = _TS_CACHE
+		if c[0] != t:
+			c[1] = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(t))
+			c[0] = t
+		return c[1]
 
 	def debug( self, message, component, code=None, color=None):
-		if DEBUG >= self.level:
+		if self._active[DEBUG]:
 			message = ensure_unicode(message)
-			self._send(DEBUG, self.TEMPLATE[DEBUG].format(self.timestamp(), code or "-", self._getComponent(component), message))
+			record  = (DEBUG, self.timestamp(), code or "-", self._getComponent(component), message)
+			self._sendRecord(DEBUG, self._format(*record), record)
 		return message
 
 	def trace( self, message, component, code=None, color=None ):
-		if TRACE >= self.level:
+		if self._active[TRACE]:
 			message = ensure_unicode(message)
-			self._send(TRACE, self.TEMPLATE[TRACE].format(self.timestamp(), code or "-", self._getComponent(component), message))
+			record  = (TRACE, self.timestamp(), code or "-", self._getComponent(component), message)
+			self._sendRecord(TRACE, self._format(*record), record)
 		return message
 
 	def info( self, message, component, code=None, color=None ):
 		"""Sends an info with the given message (as a string) and
 		component (as a string)."""
-		if INFO >= self.level:
+		if self._active[INFO]:
 			message = ensure_unicode(message)
-			self._send(INFO, self.TEMPLATE[INFO].format(self.timestamp(), code or "-", self._getComponent(component), message), color=color)
+			record  = (INFO, self.timestamp(), code or "-", self._getComponent(component), message)
+			self._sendRecord(INFO, self._format(*record), record, color=color)
 		return message
 
 	def success( self, message, component, code=None, color=None ):
 		"""Sends an success message (as a string) and
 		component (as a string)."""
-		if SUCCESS >= self.level:
+		if self._active[SUCCESS]:
 			message = ensure_unicode(message)
-			self._send(ERROR, self.TEMPLATE[SUCCESS].format(self.timestamp(),code or u"-", self._getComponent(component), message))
+			record  = (SUCCESS, self.timestamp(), code or "-", self._getComponent(component), message)
+			self._sendRecord(ERROR, self._format(*record), record)
 		return message
 
 	def warn( self, message, component, code=None, color=None):
@@ -229,45 +398,98 @@ class Reporter:
 	def warning( self, message, component, code=None, color=None):
 		"""Sends a warning with the given message (as a string) and
 		component (as a string)."""
-		if WARNING >= self.level:
+		if self._active[WARNING]:
 			message = ensure_unicode(message)
-			self._send(WARNING, self.TEMPLATE[WARNING].format(self.timestamp(), code or "-", self._getComponent(component), message))
+			record  = (WARNING, self.timestamp(), code or "-", self._getComponent(component), message)
+			self._sendRecord(WARNING, self._format(*record), record)
 		return message
 
 	def error( self, message, component, code=None, color=None ):
 		"""Sends an error with the given message (as a string) and
 		component (as a string)."""
-		if ERROR >= self.level:
+		if self._active[ERROR]:
 			message = ensure_unicode(message)
-			self._send(ERROR, self.TEMPLATE[ERROR].format(self.timestamp(),code or u"-", self._getComponent(component), message))
+			record  = (ERROR, self.timestamp(), code or "-", self._getComponent(component), message)
+			self._sendRecord(ERROR, self._format(*record), record)
 		return message
 
 	def exception( self, message, component, code=None, color=None ):
 		"""Sends an execption with the given message (as a string) and
 		component (as a string)."""
-		if EXCEPTION >= self.level:
+		if self._active[EXCEPTION]:
 			message = ensure_unicode(message)
-			self._send(EXCEPTION, self.TEMPLATE[EXCEPTION].format(self.timestamp(),code or u"-", self._getComponent(component), message))
+			record  = (EXCEPTION, self.timestamp(), code or "-", self._getComponent(component), message)
+			self._sendRecord(EXCEPTION, self._format(*record), record)
 		return message
 
 	def fatal( self, message, component, code=None, color=None ):
 		"""Sends a fatal error with the given message (as a string) and
 		component (as a string)."""
-		if FATAL >= self.level:
+		if self._active[FATAL]:
 			message = ensure_unicode(message)
-			self._send(FATAL, self.TEMPLATE[FATAL].format(self.timestamp(), code or "-", self._getComponent(component), message))
+			record  = (FATAL, self.timestamp(), code or "-", self._getComponent(component), message)
+			self._sendRecord(FATAL, self._format(*record), record)
 		return message
 
+	def _format( self, level, timestamp, code, component, message ):
+		# NOTE: TEMPLATE can be changed at any time (see `template()`), so
+		# we recompile the formatters whenever it is not the one we compiled.
+		if self._templates is not self.TEMPLATE:
+			self._formatters = [_compileTemplate(_) for _ in self.TEMPLATE]
+			self._templates  = self.TEMPLATE
+		return self._formatters[level](timestamp, code, component, message)
+
 	def _send( self, level, message, color=None ):
-		self._forward(level, message, color=color )
+		# NOTE: The `(send, takesRecords)` pair is read at once, as it may
+		# be updated concurrently by `register` and `unregister`.
+		send, takesRecords = self._dispatch
+		if takesRecords:
+			send(level, message, None, color)
+		else:
+			send(level, message, color=color)
+		return message
+
+	def _sendRecord( self, level, message, record=None, color=None ):
+		"""Sends the formatted `message` along with its `record`, as
+		`(level, timestamp, code, component, message)`, so that delegates
+		that need the individual fields don't have to extract them again."""
+		send, takesRecords = self._dispatchRecord
+		if takesRecords:
+			send(level, message, record, color)
+		else:
+			send(level, message, color=color)
 		return message
 
-	def _forward( self, level, message, color=None ):
-		for delegate in self.delegates:
-			delegate._send(level, message, color=color)
+	def _updateDispatch( self ):
+		# NOTE: We decide here once which `_send` or `_sendRecord` method
+		# each message goes to. With a single delegate, which is the usual
+		# setup, we send directly to it and skip `_forward`, unless it is
+		# overridden. `_send` always goes to the delegates, while the level
+		# methods of reporters that only implement `_send` go to it.
+		cls     = type(self)
+		senders = [_getSender(_) for _ in self.delegates]
+		if cls._forward is not Reporter._forward:
+			dispatch = (self._forward, _forwardTakesRecords(cls))
+		elif len(senders) == 1:
+			dispatch = senders[0]
+		else:
+			dispatch = (self._forward, True)
+		self._senders        = senders
+		self._dispatch       = dispatch
+		self._dispatchRecord = dispatch if _takesRecords(cls) else (self._send, False)
+
+	def _forward( self, level, message, record=None, color=None ):
+		for send, takesRecords in self._senders:
+			if takesRecords:
+				send(level, message, record, color)
+			else:
+				send(level, message, color=color)
 		return message
 
 	def _getComponent( self, component ):
+		# NOTE: We don't memoize the names of non-string components: a
+		# WeakKeyDictionary lookup builds a weakref on every call, and was
+		# measured at 0.168s per 500k calls against 0.070s for this chain.
 		if not component:
 			return "-"
 		elif isinstance(component, str):
@@ -277,6 +499,94 @@ class Reporter:
 		else:
 			return component.__class__.__name__
 
+def _takesRecords( reporterClass ):
+	"""Tells if the given reporter class accepts records through `_sendRecord`,
+	which is not the case of reporters that only override `_send`."""
+	return reporterClass._sendRecord is not Reporter._sendRecord or reporterClass._send is Reporter._send
+
+def _forwardTakesRecords( reporterClass ):
+	"""Tells if the `_forward` method of the given reporter class takes the
+	`record` argument, which overrides written before it was added don't."""
+	import inspect
+	parameters = list(inspect.signature(reporterClass._forward).parameters)
+	return len(parameters) > 3 and parameters[3] == "record"
+
+def _getSender( reporter ):
+	"""Returns the `(send, takesRecords)` pair used to send messages to the
+	given reporter."""
+	if _takesRecords(type(reporter)):
+		return reporter._sendRecord, True
+	else:
+		return reporter._send, False
+
+# ------------------------------------------------------------------------------
+#
+# ASYNC REPORTER
+#
+# ------------------------------------------------------------------------------
+
+class AsyncReporter(Reporter):
+	"""Forwards messages to its delegates from a background thread, so that
+	reporting a message only costs a queue put on the calling thread. Pending
+	messages are sent on `close()`, which is also called at exit. Once
+	closed, messages are forwarded synchronously."""
+
+	def __init__( self, level=None, template=None ):
+		Reporter.__init__(self, level, template)
+		self._queue  = queue.SimpleQueue()
+		self._closed = False
+		# NOTE: The thread only holds a weak reference to the reporter, and
+		# is stopped when the reporter is collected.
+		self._thread = threading.Thread(target=AsyncReporter._drain, args=(self._queue, weakref.ref(self)), daemon=True)
+		self._thread.start()
+		weakref.finalize(self, self._queue.put, None)
+		_CLOSE_AT_EXIT.add(self)
+
+	def close( self ):
+		"""Sends the pending messages, stops the background thread and
+		flushes the delegates."""
+		self._closed = True
+		if self._thread.is_alive():
+			self._queue.put(None)
+			self._thread.join()
+		# NOTE: Messages queued while we were closing are sent here
+		while True:
+			try:
+				item = self._queue.get_nowait()
+			except queue.Empty:
+				break
+			if item is not None:
+				Reporter._sendRecord(self, *item)
+		# NOTE: Buffered delegates may have already been flushed at exit
+		# before we drained the queue.
+		for _ in self.delegates:
+			if hasattr(_, "flush"): _.flush()
+
+	def _send( self, level, message, color=None ):
+		return self._sendRecord(level, message, None, color)
+
+	def _sendRecord( self, level, message, record=None, color=None ):
+		if self._closed:
+			Reporter._sendRecord(self, level, message, record, color)
+		else:
+			self._queue.put((level, message, record, color))
+		return message
+
+	@staticmethod
+	def _drain( messages, reporter ):
+		while True:
+			item = messages.get()
+			if item is None:
+				break
+			target = reporter()
+			if target is None:
+				break
+			try:
+				Reporter._sendRecord(target, *item)
+			except Exception as e:
+				sys.stderr.write("[!] AsyncReporter failed to send message: %s\n" % (e,))
+			del target
+
 # ------------------------------------------------------------------------------
 #
 # FILE REPORTER
@@ -284,8 +594,17 @@ class Reporter:
 # ------------------------------------------------------------------------------
 
 class FileReporter(Reporter):
+	"""Writes messages to the file at the given `path` or to the given `fd`.
+	When `buffer` is set, messages are buffered and written at once when the
+	buffer reaches `buffer` characters, `interval` seconds after the first
+	buffered message, when an `ERROR` (or above) is reported, on `close()` or
+	when the process exits. Buffering is on by default when we own the file
+	(`path`) and off for a given `fd`, which the caller may close at any time."""
 
-	def __init__( self, path=None, fd=None, level=0 ):
+	BUFFER   = 4096
+	INTERVAL = 1.0
+
+	def __init__( self, path=None, fd=None, level=0, buffer=None, interval=INTERVAL ):
 		Reporter.__init__(self, level)
 		if path:
 			self.path = path
@@ -294,24 +613,77 @@ class FileReporter(Reporter):
 			assert path is None
 			assert not (fd is None)
 			self.fd = fd
-
-	def _send( self, level, message, color=None ):
-		if self.level > level: return
+		self.buffer     = (self.BUFFER if path else 0) if buffer is None else buffer
+		self.interval   = interval
+		self._buffer    = []
+		self._size      = 0
+		self._timer     = None
+		self._lock      = threading.Lock()
+		if self.buffer:
+			_CLOSE_AT_EXIT.add(self)
+
+	def flush( self ):
+		"""Writes out the buffered messages, if any."""
+		with self._lock:
+			self._flush()
+
+	def close( self ):
+		"""Writes out the buffered messages. The reporter can still be used
+		afterwards."""
+		self.flush()
+
+	def _flush( self ):
+		# NOTE: Expects the lock to be held, so that lines appended
+		# concurrently are neither lost nor written twice.
+		if self._timer:
+			self._timer.cancel()
+			self._timer = None
+		if not self._buffer: return
+		data = "".join(self._buffer)
+		self._buffer = []
+		self._size   = 0
+		self._write(data)
+
+	def _write( self, data ):
 		if self.fd is None:
-			# We don't necessarily want this to be alway open
-			with file(self.path, "a") as fd:
-				self.fd.write(message)
-				self.fd.write("\n")
-				fd.flush()
+			# We don't necessarily want this to be alway open. As we own
+			# the file, we bypass Python's file objects and write the
+			# encoded buffer directly.
+			data = memoryview(data.encode("utf8"))
+			fd   = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+			try:
+				while data:
+					data = data[os.write(fd, data):]
+			finally:
+				os.close(fd)
 		else:
 			try:
-				self.fd.write(message)
+				self.fd.write(data)
 			except UnicodeEncodeError:
 				# On Python 2- fds are binary
-				self.fd.write(message.encode("utf8"))
-			self.fd.write("\n")
+				self.fd.write(data.encode("utf8"))
 			self.fd.flush()
 
+	def _send( self, level, message, color=None ):
+		if self._level > level: return
+		if not self.buffer:
+			if self.fd is None:
+				self._write(message + "\n")
+			else:
+				self.fd.write(message + "\n")
+				self.fd.flush()
+			return
+		with self._lock:
+			self._buffer.append(message)
+			self._buffer.append("\n")
+			self._size += len(message) + 1
+			if self._size >= self.buffer or level >= ERROR:
+				self._flush()
+			elif not self._timer:
+				self._timer = threading.Timer(self.interval, self.flush)
+				self._timer.daemon = True
+				self._timer.start()
+
 # ------------------------------------------------------------------------------
 #
 # CONSOLE REPORTER
@@ -320,10 +692,14 @@ class FileReporter(Reporter):
 
 class ConsoleReporter(FileReporter):
 
-	def __init__( self, fd=None, level=0, color=True ):
+	COLORS = _ANSI
+
+	def __init__( self, fd=None, level=0, color=True, buffer=0 ):
 		if fd is None: fd = sys.stdout
-		FileReporter.__init__(self, fd=fd, level=level)
-		self.color        = color
+		# NOTE: The console is unbuffered by default, as messages are
+		# expected to show up as they are reported.
+		FileReporter.__init__(self, fd=fd, level=level, buffer=buffer)
+		self._color       = color
 		self.colorByLevel = [
 			COLOR_CYAN_BOLD,     # DEBUG
 			COLOR_LIGHT_GRAY,    # TRACE
@@ -334,58 +710,46 @@ class ConsoleReporter(FileReporter):
 			COLOR_RED_BOLD,      # FATAL
 		]
 
+	# NOTE: The `(start, end)` color sequences for each level are
+	# precomputed, and rebuilt when `color` or `colorByLevel` are set.
+
+	@property
+	def color( self ):
+		return self._color
+
+	@color.setter
+	def color( self, color ):
+		self._color = color
+		self._updateColors()
+
+	@property
+	def colorByLevel( self ):
+		return self._colors
+
+	@colorByLevel.setter
+	def colorByLevel( self, colors ):
+		self._colors = colors
+		self._updateColors()
+
+	def _updateColors( self ):
+		self._colorByLevel = [(self._colorStart(_), self._colorEnd(_)) for _ in self._colors]
+
 	def _send( self, level, message , color=None):
-		color = color or self.getColorForLevel(level)
-		FileReporter._send(self, level, self._colorStart(color) + message + self._colorEnd(color))
+		if color:
+			start, end = self._colorStart(color), self._colorEnd(color)
+		else:
+			start, end = self._colorByLevel[max(0, min(level, len(self._colorByLevel) - 1))]
+		FileReporter._send(self, level, start + message + end)
 
 	def getColorForLevel( self, level ):
 		level = max(0, min(level, len(self.colorByLevel) - 1))
 		return self.colorByLevel[level]
 
 	def _colorStart( self, color ):
-		# SEE: http://tldp.org/HOWTO/Bash-Prompt-HOWTO/x329.html
-		if not self.color: return ''
-		if   color==COLOR_NONE:
-			return ''
-		elif color==COLOR_LIGHT_GRAY:
-			return ('[0m[00;37m')
-		elif color==COLOR_DARK_GRAY:
-			return ('[0m[01;30m')
-		elif color==COLOR_BLACK:
-			return ('[0m[00;30m')
-		elif color==COLOR_BLACK_BOLD:
-			return ('[0m[01;30m')
-		elif color==COLOR_RED:
-			return ('[0m[00;31m')
-		elif color==COLOR_RED_BOLD:
-			return ('[0m[01;31m')
-		elif color==COLOR_GREEN:
-			return ('[0m[00;32m')
-		elif color==COLOR_GREEN_BOLD:
-			return ('[0m[01;32m')
-		elif color==COLOR_BLUE:
-			return ('[0m[00;34m')
-		elif color==COLOR_BLUE_BOLD:
-			return ('[0m[01;34m')
-		elif color==COLOR_MAGENTA:
-			return ('[0m[00;35m')
-		elif color==COLOR_MAGENTA_BOLD:
-			return ('[0m[01;35m')
-		elif color==COLOR_CYAN:
-			return ('[0m[00;35m')
-		elif color==COLOR_CYAN_BOLD:
-			return ('[0m[01;35m')
-		elif color==COLOR_YELLOW:
-			# FXIME: not right
-			return ('[0m[00;34m')
-		else:
-			raise Exception("ConsoleReporter._colorStart: Unsupported color", color)
+		return self.COLORS.get(color, "") if self._color else ""
 
 	def _colorEnd( self, color ):
-		if self.color and color != COLOR_NONE:
-			return ('[0m')
-		else:
-			return ''
+		return _RESET if self._color and color != COLOR_NONE else ""
 
 # ------------------------------------------------------------------------------
 #
@@ -395,8 +759,8 @@ class ConsoleReporter(FileReporter):
 
 class StderrReporter(ConsoleReporter):
 
-	def __init__( self, level=0, color=True ):
-		ConsoleReporter.__init__(self, fd=sys.stderr, level=level, color=color)
+	def __init__( self, level=0, color=True, buffer=0 ):
+		ConsoleReporter.__init__(self, fd=sys.stderr, level=level, color=color, buffer=buffer)
 
 # ------------------------------------------------------------------------------
 #
@@ -406,8 +770,8 @@ class StderrReporter(ConsoleReporter):
 
 class StdoutReporter(ConsoleReporter):
 
-	def __init__( self, level=0, color=True ):
-		ConsoleReporter.__init__(self, fd=sys.stdout, level=level, color=color)
+	def __init__( self, level=0, color=True, buffer=0 ):
+		ConsoleReporter.__init__(self, fd=sys.stdout, level=level, color=color, buffer=buffer)
 
 # ------------------------------------------------------------------------------
 #
@@ -430,16 +794,47 @@ class SMTPReporter(Reporter):
 	|--
 	""".replace("\t|", "")
 
-	def __init__( self, recipient, user=None, password=None, origin=None, host="localhost", level=0 ):
+	INTERVAL = 5.0
+
+	def __init__( self, recipient, user=None, password=None, origin=None, host="localhost", level=0, interval=INTERVAL ):
 		Reporter.__init__(self, level=level)
 		self.host      = host
 		self.recipient = recipient
 		self.origin    = origin or "reporter@%s" % (host)
 		self.user      = user
 		self.password  = password
+		self.interval  = interval
+		self._server   = None
+		self._batch    = []
+		self._timer    = None
+		self._lock     = threading.Lock()
+		# NOTE: The connection has its own lock, so that messages can still
+		# be queued while a batch is being sent.
+		self._sendLock = threading.Lock()
+		_CLOSE_AT_EXIT.add(self)
+
+	def _getServer( self ):
+		"""Returns the SMTP connection, reusing the current one if it is
+		still alive."""
+		# NOTE: smtplib is imported lazily, as it pulls in `email` and `ssl`
+		import smtplib
+		if self._server:
+			try:
+				if self._server.noop()[0] == 250:
+					return self._server
+			except (smtplib.SMTPException, socket.error):
+				pass
+			self._server = None
+		server = smtplib.SMTP(self.host)
+		server.ehlo()
+		server.starttls()
+		server.ehlo()
+		if self.password:
+			server.login(self.user, self.password)
+		self._server = server
+		return server
 
 	def send(self, message, subject=None):
-		server = smtplib.SMTP(self.host)
 		email  = string.Template(self.MESSAGE).safe_substitute({
 			"from": self.origin,
 			"to": self.recipient,
@@ -448,20 +843,59 @@ class SMTPReporter(Reporter):
 			"level"  : self.level,
 			"timestamp": self.timestamp(),
 		})
-		server.ehlo()
-		server.starttls()
-		server.ehlo()
-		if self.password:
-			server.login(self.user, self.password)
-		server.sendmail(self.origin, self.recipient, email)
+		import smtplib
 		try:
-			server.quit()
-		except:
-			pass
+			self._getServer().sendmail(self.origin, self.recipient, email)
+		except smtplib.SMTPServerDisconnected:
+			self._server = None
+			self._getServer().sendmail(self.origin, self.recipient, email)
 		return email
 
-	def _send( self, level, message ):
-		self.send(message, "[!][%s]FF-Collector: %s" % (level, message[:30]))
+	def flush( self ):
+		"""Sends the queued messages as a single email."""
+		with self._lock:
+			if self._timer:
+				self._timer.cancel()
+				self._timer = None
+			if not self._batch:
+				return
+			batch = self._batch
+			self._batch = []
+		# NOTE: The subject shows the first of the highest level messages
+		level, _, summary = max(batch, key=lambda _: _[0])
+		try:
+			with self._sendLock:
+				self.send("\n---\n".join(_[1] for _ in batch), "[!][%s]FF-Collector: %s" % (level, summary[:30]))
+		except Exception as e:
+			sys.stderr.write("[!] SMTPReporter failed to send %d message(s): %s\n" % (len(batch), e))
+
+	def close( self ):
+		"""Sends the queued messages and closes the SMTP connection."""
+		self.flush()
+		with self._sendLock:
+			if self._server:
+				try:
+					self._server.quit()
+				except:
+					pass
+				self._server = None
+
+	def _send( self, level, message, color=None ):
+		return self._sendRecord(level, message, None, color)
+
+	def _sendRecord( self, level, message, record=None, color=None ):
+		# NOTE: The subject summarizes the raw message when we have it,
+		# rather than the formatted one.
+		summary = str(record[4]) if record else message
+		with self._lock:
+			self._batch.append((level, message, summary))
+			is_fatal = level >= FATAL
+			if not is_fatal and not self._timer:
+				self._timer = threading.Timer(self.interval, self.flush)
+				self._timer.daemon = True
+				self._timer.start()
+		if is_fatal:
+			self.flush()
 
 # ------------------------------------------------------------------------------
 #
@@ -478,7 +912,8 @@ class XMPPReporter(Reporter):
 		self.recipients = toUser
 		self._sendMessage = None
 		try:
-			self._sendMessage = pyxmpp2.simple.send_message
+			from pyxmpp2.simple import send_message
+			self._sendMessage = send_message
 		except ImportError as e:
 			raise Exception("PyXMPP2 Module is required for Jabber reporting")
 
@@ -494,14 +929,29 @@ class XMPPReporter(Reporter):
 
 class BeanstalkReporter(Reporter):
 	"""Allows to send jobs on the Beanstalkd work queue, that could later be
-	processed by a BeanstalkWorker."""
+	processed by a BeanstalkWorker. Messages are sent in batches, as a single
+	job, once `batch` messages are queued, once the job would exceed `size`
+	bytes or after `interval` seconds."""
 
-	def __init__( self, host="0.0.0.0", port=11300, tube="report", level=0 ):
+	BATCH    = 64
+	INTERVAL = 0.1
+	# NOTE: beanstalkd's default max-job-size is 65535 bytes
+	SIZE     = 60000
+
+	def __init__( self, host="0.0.0.0", port=11300, tube="report", level=0, batch=BATCH, interval=INTERVAL, size=SIZE ):
 		Reporter.__init__(self, level=level)
 		self.host = host
 		self.port = port
 		self.tube = tube
+		self.batch    = batch
+		self.interval = interval
+		self.size     = size
 		self.beanstalk = None
+		self._batch = []
+		self._size  = 0
+		self._timer = None
+		self._lock  = threading.Lock()
+		_CLOSE_AT_EXIT.add(self)
 		try:
 			self.connect()
 		except socket.error as e:
@@ -513,15 +963,57 @@ class BeanstalkReporter(Reporter):
 		self.beanstalk  = self.beanstalkc.Connection(host=self.host, port=self.port)
 		self.beanstalk.use(self.tube)
 
-	def _send( self, level, message, color=None ):
-		if self.beanstalk:
-			self.beanstalk.put(json.dumps({
-				"type"    : "reporter.Message",
-				"message" : message,
-				"level"   : level,
-			}))
-		else:
+	def flush( self ):
+		"""Sends the queued messages as a single `reporter.MessageBatch` job."""
+		with self._lock:
+			self._flush()
+
+	def close( self ):
+		self.flush()
+
+	def _flush( self ):
+		# NOTE: Expects the lock to be held
+		if self._timer:
+			self._timer.cancel()
+			self._timer = None
+		if not self._batch:
+			return
+		# The items are already serialized, so we only assemble the job
+		items = self._batch
+		self._batch = []
+		self._size  = 0
+		if not self.beanstalk:
 			print ("[!] BeanstalkWorker cannot connect to beanstalkd server")
+			return
+		try:
+			self.beanstalk.put('{"type": "reporter.MessageBatch", "items": [' + ", ".join(items) + "]}")
+		except Exception as e:
+			sys.stderr.write("[!] BeanstalkReporter failed to send %d message(s): %s\n" % (len(items), e))
+
+	def _send( self, level, message, color=None ):
+		return self._sendRecord(level, message, None, color)
+
+	def _sendRecord( self, level, message, record=None, color=None ):
+		item = {
+			"message" : message,
+			"level"   : level,
+		}
+		if record:
+			item["timestamp"] = record[1]
+			item["code"]      = str(record[2])
+			item["component"] = record[3]
+		item = json.dumps(item)
+		with self._lock:
+			if self._batch and self._size + len(item) > self.size:
+				self._flush()
+			self._batch.append(item)
+			self._size += len(item) + 2
+			if len(self._batch) >= self.batch or self._size >= self.size:
+				self._flush()
+			elif not self._timer:
+				self._timer = threading.Timer(self.interval, self.flush)
+				self._timer.daemon = True
+				self._timer.start()
 
 # ------------------------------------------------------------------------------
 #
@@ -555,7 +1047,7 @@ class BeanstalkWorker:
 		try:
 			job  = self.beanstalk.reserve()
 		except (self.beanstalkc.DeadlineSoon, self.beanstalkc.CommandFailed, self.beanstalkc.UnexpectedResponse) as e:
-			reporter.error(str(e), "beanstalkc")
+			error(str(e), "beanstalkc")
 			return False
 		# We make sure that the job is JSON
 		try:
@@ -563,14 +1055,17 @@ class BeanstalkWorker:
 		except:
 			job.release()
 			return False
-		if not data or not (type(data) is dict) or not (data.get("type") == "reporter.Message"):
+		if not data or not (type(data) is dict) or not (data.get("type") in ("reporter.Message", "reporter.MessageBatch")):
 			return False
 		else:
 			self._process(data, job)
 			return True
 
 	def _process( self, message, job ):
-		REPORTER._send( message["level"], message["message"] )
+		# NOTE: Batches are sent by `BeanstalkReporter`, single messages
+		# may come from other producers.
+		for _ in (message["items"] if message["type"] == "reporter.MessageBatch" else (message,)):
+			REPORTER._send( _["level"], _["message"] )
 		job.delete()
 
 # ------------------------------------------------------------------------------
@@ -640,6 +1135,9 @@ def _template(templates):
 def template(templates):
 	return _template(templates)
 
+# Bound functions by component name, see `bind`
+_BOUND = {}
+
 def bind( component, name=None, template=None):
 	"""Returns `(debug,trace,info,warning,error,fatal)` functions that take `(message,code=None)`
 	as parameters. This should be used in the following way, at the head of a
@@ -650,35 +1148,81 @@ def bind( component, name=None, template=None):
 	and then
 
 	>    info("Hello, world!")
-	"""
+
+	When given an object instance, the functions are also set as attributes of
+	the instance, bound to `name` or the instance's class name."""
 	if template: _template(template)
-	if   type(component) is object:
+	if   isinstance(component, str):
+		# NOTE: The bound functions only depend on the component, so
+		# they're shared by all the calls binding the same component.
+		if component in _BOUND:
+			return _BOUND[component]
+		def wrap(function, level):
+			if level < MAX_LEVEL: return _noop
+			def _(*args, code=None, color=None):
+				# NOTE: We skip the message building when the level is off
+				if not REPORTER._active[level]: return
+				if len(args) == 1:
+					message = args[0]
+					message = message if type(message) is str else str(message, "utf8") if isinstance(message, bytes) else str(message)
+				else:
+					message = u" ".join([_ if type(_) is str else str(_, "utf8") if isinstance(_, bytes) else str(_) for _ in args])
+				function(message, component, code=code, color=color)
+			return _
+		res = _BOUND[component] = LoggingInterface(
+			wrap(debug,     DEBUG),
+			wrap(trace,     TRACE),
+			wrap(info,      INFO),
+			wrap(warn,      WARNING),
+			wrap(warning,   WARNING),
+			wrap(error,     ERROR),
+			wrap(exception, EXCEPTION),
+			wrap(fatal,     FATAL)
+		)
+		return res
+	elif not isinstance(component, type) and hasattr(component, "__dict__"):
+		# NOTE: Instances get the bound functions as attributes. Classes are
+		# not supported, as the functions would become methods.
+		res = bind(name or component.__class__.__name__, template=template)
 		(component.debug,
 		component.trace,
 		component.info,
+		component.warn,
 		component.warning,
 		component.error,
 		component.exception,
-		component.fatal) = bind(name or component.__class__.__name__, template=template)
-	elif isinstance(component, str):
-		def wrap(function):
-			def _(*args,**kwargs):
-				args = list(ensure_unicode(_) for _ in args)
-				function(u" ".join(map(lambda _:u"{0}".format(_),args)), component, code=kwargs.get("code"), color=kwargs.get("color"))
-			return _
-		return LoggingInterface(
-			wrap(debug),
-			wrap(trace),
-			wrap(info),
-			wrap(warn),
-			wrap(warning),
-			wrap(error),
-			wrap(exception),
-			wrap(fatal)
-		)
+		component.fatal) = res
+		return res
 	else:
 		raise Exception("reporter.bind: Unsupported type: %s" % (type(component)))
 
+def _noop( message=None, *args, **kwargs ):
+	return message
+
+def _noopMethod( self, message=None, *args, **kwargs ):
+	return message
+
+def _stripLevels( maxLevel ):
+	"""Compiles out the levels below `maxLevel` by replacing the module
+	functions and the `Reporter` methods with no-ops. Like any compile-time
+	switch, `setLevel` can't re-enable them afterwards."""
+	module = globals()
+	for level, names in (
+			(DEBUG,     ("debug",)),
+			(TRACE,     ("trace",)),
+			(INFO,      ("info",)),
+			(SUCCESS,   ("success",)),
+			(WARNING,   ("warn", "warning")),
+			(ERROR,     ("error",)),
+			(EXCEPTION, ("exception",)),
+			(FATAL,     ("fatal",))):
+		if level < maxLevel:
+			for name in names:
+				if name in module: module[name] = _noop
+				setattr(Reporter, name, _noopMethod)
+
+_stripLevels(MAX_LEVEL)
+
 # NOTE: We don't install by default, as when the module is imported multiple times
 # from multiple locations, this results in duplicated messages.
 if not IS_INSTALLED:
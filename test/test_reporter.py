@@ -0,0 +1,368 @@
+import os, sys, io, gc, time, tempfile, threading, unittest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "py"))
+import reporter, types, json, contextlib, subprocess
+
+class Sink:
+	"""A file-like object that counts the lines written to it."""
+
+	def __init__( self ):
+		self.lines = []
+		self.lock  = threading.Lock()
+
+	def write( self, data ):
+		with self.lock:
+			self.lines.extend(data.splitlines())
+
+	def flush( self ):
+		pass
+
+class FileReporterTest(unittest.TestCase):
+
+	def testThreadedBufferedWrites( self ):
+		sink = Sink()
+		r    = reporter.FileReporter(fd=sink, buffer=4096)
+		def send( i ):
+			for j in range(2000):
+				r._send(reporter.INFO, "%d:%d" % (i, j))
+		threads = [threading.Thread(target=send, args=(i,)) for i in range(8)]
+		for _ in threads: _.start()
+		for _ in threads: _.join()
+		r.close()
+		self.assertEqual(len(sink.lines), 8 * 2000)
+		self.assertEqual(len(set(sink.lines)), 8 * 2000)
+
+	def testIntervalFlush( self ):
+		with tempfile.TemporaryDirectory() as path:
+			path = os.path.join(path, "log")
+			r    = reporter.FileReporter(path, interval=0.1)
+			r.info("hello", "test")
+			self.assertFalse(os.path.exists(path))
+			time.sleep(0.5)
+			with open(path, encoding="utf8") as f:
+				self.assertIn("hello", f.read())
+
+	def testUnbufferedFd( self ):
+		fd = io.StringIO()
+		r  = reporter.FileReporter(fd=fd)
+		r.info("hello", "test")
+		self.assertIn("hello", fd.getvalue())
+
+class ReporterTest(unittest.TestCase):
+
+	def testLevelAttribute( self ):
+		fd = io.StringIO()
+		r  = reporter.FileReporter(fd=fd, level=reporter.ERROR)
+		r.debug("hidden", "test")
+		r.level = reporter.DEBUG
+		r.debug("shown", "test")
+		self.assertNotIn("hidden", fd.getvalue())
+		self.assertIn("shown", fd.getvalue())
+
+	def testForwardOverride( self ):
+		sent = []
+		class Forwarding(reporter.Reporter):
+			def _forward( self, level, message, record=None, color=None ):
+				sent.append(message)
+		r = Forwarding(level=reporter.DEBUG)
+		r.register(reporter.FileReporter(fd=io.StringIO()))
+		r.info("hello", "test")
+		self.assertEqual(len(sent), 1)
+
+	def testLegacyForwardOverride( self ):
+		sent = []
+		class Forwarding(reporter.Reporter):
+			def _forward( self, level, message, color=None ):
+				sent.append(message)
+		r = Forwarding(level=reporter.DEBUG)
+		r.register(reporter.FileReporter(fd=io.StringIO()))
+		r.info("hello", "test")
+		self.assertEqual(len(sent), 1)
+
+	def testSendOverride( self ):
+		fd = io.StringIO()
+		class Prefix(reporter.Reporter):
+			def _send( self, level, message, color=None ):
+				return reporter.Reporter._send(self, level, "PFX " + message, color=color)
+		r = Prefix(level=reporter.DEBUG)
+		r.register(reporter.FileReporter(fd=fd))
+		r.info("hello", "test")
+		self.assertTrue(fd.getvalue().startswith("PFX "))
+		self.assertIn("hello", fd.getvalue())
+
+	def testRecords( self ):
+		messages = []
+		records  = []
+		class Legacy(reporter.Reporter):
+			def _send( self, level, message, color=None ):
+				messages.append(message)
+		class Structured(reporter.Reporter):
+			def _sendRecord( self, level, message, record=None, color=None ):
+				records.append(record)
+		r = reporter.Reporter(level=reporter.DEBUG)
+		r.register(Legacy())
+		r.info("one", "test", code=1)
+		r.register(Structured())
+		r.warning("two", "test")
+		self.assertEqual(len(messages), 2)
+		self.assertTrue(messages[1].endswith("two"))
+		self.assertEqual(records, [(reporter.WARNING, records[0][1], "-", "test", "two")])
+
+	def testUnregister( self ):
+		a, b, c = Sink(), Sink(), Sink()
+		first   = reporter.FileReporter(fd=a)
+		second  = reporter.FileReporter(fd=b)
+		console = reporter.ConsoleReporter(fd=c, color=False)
+		r = reporter.Reporter(level=reporter.DEBUG)
+		r.register(first, console, second)
+		r.unregister(first)
+		self.assertTrue(r.has(reporter.FileReporter))
+		self.assertTrue(r.has(reporter.ConsoleReporter))
+		self.assertEqual(r.delegates, [console, second])
+		r.info("kept", "test")
+		self.assertEqual((len(a.lines), len(b.lines), len(c.lines)), (0, 1, 1))
+		with self.assertRaises(ValueError):
+			r.unregister(first)
+		r.unregister(second)
+		self.assertFalse(r.has(reporter.FileReporter))
+		self.assertEqual(r.delegates, [console])
+
+class AsyncReporterTest(unittest.TestCase):
+
+	def testOrderedDelivery( self ):
+		sink = Sink()
+		r    = reporter.AsyncReporter(level=reporter.DEBUG)
+		r.register(reporter.FileReporter(fd=sink, buffer=4096))
+		for i in range(1000):
+			r.info("message %d" % (i,), "test")
+		r.close()
+		self.assertEqual([_.rsplit(" ", 1)[-1] for _ in sink.lines], [str(_) for _ in range(1000)])
+
+	def testAfterClose( self ):
+		sink = Sink()
+		r    = reporter.AsyncReporter(level=reporter.DEBUG)
+		r.register(reporter.FileReporter(fd=sink))
+		r.close()
+		r.info("after close", "test")
+		self.assertEqual(len(sink.lines), 1)
+
+	def testCollected( self ):
+		r      = reporter.AsyncReporter()
+		thread = r._thread
+		del r
+		gc.collect()
+		thread.join(1)
+		self.assertFalse(thread.is_alive())
+
+class Beanstalk:
+	"""A fake beanstalkc connection that enforces the default job size."""
+
+	def __init__( self, host=None, port=None ):
+		self.jobs = []
+
+	def use( self, tube ):
+		pass
+
+	def put( self, body ):
+		if len(body) > 65535:
+			raise Exception("JOB_TOO_BIG")
+		self.jobs.append(json.loads(body))
+
+class BeanstalkReporterTest(unittest.TestCase):
+
+	def setUp( self ):
+		sys.modules["beanstalkc"] = types.SimpleNamespace(Connection=Beanstalk)
+
+	def tearDown( self ):
+		del sys.modules["beanstalkc"]
+
+	def testBatchSize( self ):
+		r = reporter.BeanstalkReporter(batch=64)
+		for i in range(64):
+			r._send(reporter.ERROR, "%d %s" % (i, "x" * 4000))
+		r.close()
+		jobs = r.beanstalk.jobs
+		self.assertGreater(len(jobs), 1)
+		self.assertEqual(sum(len(_["items"]) for _ in jobs), 64)
+
+	def testBatchInterval( self ):
+		r = reporter.BeanstalkReporter(interval=0.05)
+		r._send(reporter.INFO, "hello")
+		time.sleep(0.3)
+		self.assertEqual(r.beanstalk.jobs[0]["items"][0]["message"], "hello")
+
+	def testFailureReported( self ):
+		r      = reporter.BeanstalkReporter()
+		errors = io.StringIO()
+		with contextlib.redirect_stderr(errors):
+			r._send(reporter.INFO, "x" * 70000)
+			r.close()
+		self.assertIn("failed to send 1 message", errors.getvalue())
+
+class SMTP:
+	"""A fake smtplib.SMTP connection that records the sent emails."""
+
+	EMAILS = []
+
+	def __init__( self, host ):
+		pass
+
+	def ehlo( self ):
+		pass
+
+	def starttls( self ):
+		pass
+
+	def noop( self ):
+		return (250, b"OK")
+
+	def sendmail( self, origin, recipient, email ):
+		self.EMAILS.append(email)
+
+	def quit( self ):
+		pass
+
+class SMTPReporterTest(unittest.TestCase):
+
+	def setUp( self ):
+		import smtplib
+		self.smtp    = smtplib.SMTP
+		smtplib.SMTP = SMTP
+		del SMTP.EMAILS[:]
+
+	def tearDown( self ):
+		import smtplib
+		smtplib.SMTP = self.smtp
+
+	def testBatchSubject( self ):
+		r = reporter.SMTPReporter("admin@localhost", interval=10)
+		r.error("first error", "test")
+		r.warning("a warning", "test")
+		r.fatal("boom", "test")
+		self.assertEqual(len(SMTP.EMAILS), 1)
+		self.assertIn("Subject: [!][%d]FF-Collector: boom" % (reporter.FATAL,), SMTP.EMAILS[0])
+		self.assertIn("first error", SMTP.EMAILS[0])
+		r.close()
+
+	def testFailureReported( self ):
+		import smtplib
+		class Refusing(SMTP):
+			def sendmail( self, origin, recipient, email ):
+				raise smtplib.SMTPRecipientsRefused({recipient:(550, b"refused")})
+		smtplib.SMTP = Refusing
+		r = reporter.SMTPReporter("admin@localhost", interval=10)
+		r.error("lost", "test")
+		stderr = io.StringIO()
+		with contextlib.redirect_stderr(stderr):
+			r.fatal("boom", "test")
+		self.assertIn("SMTPReporter failed to send 2 message(s)", stderr.getvalue())
+		self.assertEqual(r._batch, [])
+		r.close()
+
+class BindTest(unittest.TestCase):
+
+	def testBindInstance( self ):
+		class Service:
+			pass
+		service = Service()
+		res = reporter.bind(service)
+		self.assertIs(service.info, res.info)
+		self.assertIs(reporter.bind("Service"), res)
+		with self.assertRaises(Exception):
+			reporter.bind(object())
+
+class ConsoleReporterTest(unittest.TestCase):
+
+	def testColorToggle( self ):
+		sink = Sink()
+		console = reporter.ConsoleReporter(fd=sink)
+		console._send(reporter.ERROR, "colored")
+		console.color = False
+		console._send(reporter.ERROR, "plain")
+		console.color = True
+		console.colorByLevel = [reporter.COLOR_NONE] * 7
+		console._send(reporter.ERROR, "none")
+		self.assertIn("\x1b", sink.lines[0])
+		self.assertEqual(sink.lines[1:], ["plain", "none"])
+
+class TemplateTest(unittest.TestCase):
+
+	VALUES = [
+		("2026-01-01T00:00:00", "code", "component", "message"),
+		("2026-01-01T00:00:00", 404, "component", None),
+		("2026-01-01T00:00:00", "code", "component", 12.5),
+		("", "", "", ""),
+	]
+
+	TEMPLATES = reporter.TEMPLATE_DEFAULT + [
+		"{{x}} {3}",
+		"{3}}}",
+		"{0!r} {3}",
+		"{3:>5}",
+		"{} {} {} {}",
+		"{3}{3}",
+		"{0}{1}{2}{3}",
+		"{0}│{1}│{2}│{3}│{0}",
+		"no fields",
+	]
+
+	def assertEquivalent( self, templates ):
+		"""Asserts that the compiled templates render like `str.format`,
+		including when it fails."""
+		for template in templates:
+			render = reporter._compileTemplate(template)
+			for values in self.VALUES:
+				with self.subTest(template=template, values=values):
+					try:
+						expected = template.format(*values)
+					except Exception as e:
+						with self.assertRaises(type(e)):
+							render(*values)
+					else:
+						self.assertEqual(render(*values), expected)
+
+	def testCompiledTemplates( self ):
+		self.assertEquivalent(self.TEMPLATES)
+
+	def testSingleFieldTemplates( self ):
+		self.assertEquivalent(reporter.TEMPLATE_COMPACT + reporter.TEMPLATE_COMMAND + ["{0}", "[{1}]", "{2}: ", "{3}{{}}"])
+
+class MaxLevelTest(unittest.TestCase):
+
+	PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "py")
+
+	STRIPPED = """\
+service = type("Service", (), {})()
+bound   = reporter.bind(service)
+assert reporter.debug is reporter._noop and reporter.info is reporter._noop
+assert reporter.Reporter.debug is reporter._noopMethod and reporter.Reporter.info is reporter._noopMethod
+assert bound.debug is reporter._noop and bound.info is reporter._noop and service.info is reporter._noop
+reporter.debug("dropped"); reporter.info("dropped")
+reporter.REPORTER.debug("dropped"); reporter.REPORTER.info("dropped")
+bound.debug("dropped"); service.info("dropped")
+reporter.warning("kept"); bound.error("kept")
+"""
+
+	def runScript( self, script, maxLevel ):
+		"""Runs the script in a new interpreter, as `MAX_LEVEL` is applied
+		when the module is imported."""
+		script = "import sys\nsys.path.insert(0, %r)\nimport reporter\n%s" % (self.PATH, script)
+		env    = dict(os.environ, REPORTER_MAX_LEVEL=maxLevel)
+		return subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, timeout=60)
+
+	def testWarn( self ):
+		res = self.runScript(self.STRIPPED + "print(reporter.MAX_LEVEL)", "WARN")
+		self.assertEqual(res.returncode, 0, res.stderr)
+		self.assertNotIn("dropped", res.stderr)
+		self.assertEqual(res.stderr.count("kept"), 2)
+		self.assertEqual(res.stdout.strip(), str(reporter.WARNING))
+
+	def testInvalid( self ):
+		res = self.runScript("print(reporter.MAX_LEVEL, reporter.debug is reporter._noop)", "LOUD")
+		self.assertEqual(res.returncode, 0, res.stderr)
+		self.assertIn("Unsupported REPORTER_MAX_LEVEL='LOUD'", res.stderr)
+		self.assertEqual(res.stdout.split(), [str(reporter.DEBUG), "False"])
+
+if __name__ == "__main__":
+	unittest.main()
+
+# EOF - vim: ts=4 sw=4 noet